@@ -1,16 +1,87 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
-import glob
+import io
+import contextlib
 import numpy as np
-from scipy.stats import gmean
+from concurrent.futures import ProcessPoolExecutor
 
+# Figure reused by each worker process for all files it plots
+_worker_ax = None
 
-def plot_query_performance(csv_file, time_col="Med_ms", save_plots=True):
+
+def gmean(values):
+    """Geometric mean of strictly positive values"""
+    return np.exp(np.log(np.asarray(values, dtype=np.float64)).mean())
+
+
+def load_csv(csv_file):
+    """Read a benchmark CSV, preferring the multithreaded pyarrow parser"""
     try:
-        # Load CSV
+        df = pd.read_csv(csv_file, engine="pyarrow", dtype_backend="pyarrow")
+    except (ImportError, TypeError):
+        # pyarrow not installed (ImportError) or pandas < 2.0 without the
+        # dtype_backend keyword (TypeError), use the default parser
         df = pd.read_csv(csv_file)
 
+    # DB names come from a small vocabulary, store them as integer codes
+    if "DB" in df.columns:
+        known_dbs = ["Postgres", "SQLite", "HSQLDB"]
+        other_dbs = sorted(set(df["DB"].dropna().unique()) - set(known_dbs))
+        df["DB"] = df["DB"].astype(
+            pd.CategoricalDtype(categories=known_dbs + other_dbs, ordered=True)
+        )
+
+    return df
+
+
+def performance_png_name(csv_file):
+    """Name of the PNG saved for a CSV file, e.g. count_2024_performance.png"""
+    return os.path.splitext(os.path.basename(csv_file))[0] + "_performance.png"
+
+
+def plot_grouped_bars(ax, matrix, dbs, rows, value_fmt):
+    """Draw labelled bars per row count, matrix[i, j] is dbs[i] at rows[j]"""
+    bar_width = 0.35 if len(rows) <= 2 else 0.2
+    x = np.arange(len(dbs))
+
+    # Each row count is a single bar call covering all databases
+    for i, row in enumerate(rows):
+        values = matrix[:, i]
+
+        bars = ax.bar(
+            x + i * bar_width,
+            values,
+            width=bar_width,
+            label=f"{row:,} rows",
+        )
+
+        # Add value labels on bars, skipping missing data
+        ax.bar_label(
+            bars,
+            labels=[format(v, value_fmt) if v > 0 else "" for v in values],
+            padding=3,
+            fontsize=8,
+        )
+
+    ax.set_xticks(x + (len(rows) - 1) / 2 * bar_width)
+    ax.set_xticklabels(dbs)
+
+
+def plot_query_performance(
+    csv_file,
+    time_col="Med_ms",
+    save_plots=True,
+    df=None,
+    ax=None,
+    dpi=120,
+    output_name=None,
+):
+    try:
+        # Load CSV unless an already parsed frame was passed in
+        if df is None:
+            df = load_csv(csv_file)
+
         # Check if required columns exist
         required_cols = ["DB", "rows", time_col]
         if not all(col in df.columns for col in required_cols):
@@ -19,7 +90,7 @@ def plot_query_performance(csv_file, time_col="Med_ms", save_plots=True):
 
         # Pivot for easier plotting
         pivot_df = df.pivot_table(
-            index=["DB", "rows"], values=time_col, aggfunc="mean"
+            index=["DB", "rows"], values=time_col, aggfunc="mean", observed=True
         ).reset_index()
 
         # Define preferred DB order, but only use DBs that exist in data
@@ -30,86 +101,59 @@ def plot_query_performance(csv_file, time_col="Med_ms", save_plots=True):
         # Add any remaining DBs not in preferred order
         dbs.extend([db for db in available_dbs if db not in dbs])
 
-        # Reorder DBs
-        pivot_df["DB"] = pd.Categorical(pivot_df["DB"], categories=dbs, ordered=True)
-        pivot_df = pivot_df.sort_values(["DB", "rows"])
-
         # Get unique row counts
         rows = sorted(pivot_df["rows"].unique())
 
-        # Plot grouped bar chart
-        fig, ax = plt.subplots(figsize=(12, 6))
-        bar_width = 0.35 if len(rows) <= 2 else 0.2
-        x = range(len(dbs))
-
-        for i, row in enumerate(rows):
-            values = []
-            for db in dbs:
-                db_row_data = pivot_df[
-                    (pivot_df["DB"] == db) & (pivot_df["rows"] == row)
-                ]
-                if len(db_row_data) > 0:
-                    values.append(db_row_data[time_col].values[0])
-                else:
-                    values.append(0)  # Skip missing data
-
-            ax.bar(
-                [pos + i * bar_width for pos in x],
-                values,
-                width=bar_width,
-                label=f"{row:,} rows",
+        # Matrix of values indexed by (db, row count) in plot order, missing data as 0
+        matrix = (
+            pivot_df.pivot(index="DB", columns="rows", values=time_col)
+            .reindex(index=dbs, columns=rows)
+            .to_numpy(dtype=np.float64, na_value=0.0)
+        )
+
+        # Plot grouped bar chart, reusing the caller's axes if given
+        owns_fig = ax is None
+        if owns_fig:
+            fig, ax = plt.subplots(figsize=(12, 6))
+        else:
+            fig = ax.figure
+            ax.clear()
+            # Reset the margins left by the previous file's tight_layout
+            fig.subplots_adjust(
+                **{
+                    side: plt.rcParams[f"figure.subplot.{side}"]
+                    for side in ("left", "bottom", "right", "top")
+                }
             )
 
+        plot_grouped_bars(ax, matrix, dbs, rows, ".0f")
+
         # Formatting
-        ax.set_xticks([pos + (len(rows) - 1) / 2 * bar_width for pos in x])
-        ax.set_xticklabels(dbs)
         ax.set_ylabel(f"{time_col} (ms)")
         ax.set_xlabel("Database")
 
-        # Create title from filename and query info
-        base_name = os.path.splitext(os.path.basename(csv_file))[0]
-        query_name = df["query"].iloc[0] if "query" in df.columns else base_name
+        # Create title from query info, falling back to the filename
+        if "query" in df.columns:
+            query_name = df["query"].iat[0]
+        else:
+            query_name = os.path.splitext(os.path.basename(csv_file))[0]
         ax.set_title(f"Query Performance: {query_name}")
 
         ax.legend(title="Dataset Size", bbox_to_anchor=(1.05, 1), loc="upper left")
         ax.grid(True, alpha=0.3)
 
-        # Add value labels on bars
-        for i, row in enumerate(rows):
-            values = []
-            for db in dbs:
-                db_row_data = pivot_df[
-                    (pivot_df["DB"] == db) & (pivot_df["rows"] == row)
-                ]
-                if len(db_row_data) > 0:
-                    values.append(db_row_data[time_col].values[0])
-                else:
-                    values.append(0)
-
-            max_val = (
-                max([v for v in values if v > 0]) if any(v > 0 for v in values) else 1
-            )
-            for j, v in enumerate(values):
-                if v > 0:
-                    ax.text(
-                        j + i * bar_width,
-                        v + max_val * 0.02,
-                        f"{v:.0f}",
-                        ha="center",
-                        va="bottom",
-                        fontsize=8,
-                        rotation=0,
-                    )
-
-        plt.tight_layout()
+        fig.tight_layout()
 
         if save_plots:
-            # Save plot as PNG
-            output_name = f"{base_name}_performance.png"
-            plt.savefig(output_name, dpi=300, bbox_inches="tight")
+            # Save plot as PNG, named after the CSV unless given
+            if output_name is None:
+                output_name = performance_png_name(csv_file)
+            fig.savefig(output_name, dpi=dpi, bbox_inches="tight")
             print(f"Saved plot: {output_name}")
-            # Close the figure to prevent it from showing and free memory
-            plt.close(fig)
+            # Close the figure to prevent it from showing and free memory,
+            # a shared figure is closed by its owner
+            if owns_fig:
+                plt.close(fig)
         else:
             # Only show if not saving
             plt.show()
@@ -118,103 +162,81 @@ def plot_query_performance(csv_file, time_col="Med_ms", save_plots=True):
         print(f"Error processing {csv_file}: {str(e)}")
 
 
-def plot_geometric_mean_performance(time_col="Med_ms", save_plots=True):
+def plot_geometric_mean_performance(dfs, time_col="Med_ms", save_plots=True, dpi=120):
     """Generate a geometric mean performance diagram across all queries that ran on all three databases"""
     try:
-        # Find all CSV files
-        csv_files = glob.glob("*.csv")
-        if not csv_files:
+        # dfs maps each CSV file name to its parsed DataFrame
+        if not dfs:
             print("No CSV files found for geometric mean calculation.")
             return
 
-        all_data = []
+        slices = []
         target_dbs = {"Postgres", "SQLite", "HSQLDB"}
 
-        # Collect data from all CSV files
-        for csv_file in csv_files:
+        # Collect the target database rows and used columns from all CSV files
+        for csv_file, df in dfs.items():
             try:
-                df = pd.read_csv(csv_file)
                 required_cols = ["DB", "rows", time_col]
 
                 if not all(col in df.columns for col in required_cols):
                     continue
 
-                # Group by query and rows to check if all three databases are present
-                for (rows, query), group in df.groupby(["rows", "query"]):
-                    available_dbs = set(group["DB"].unique())
-
-                    # Only include if all three target databases are present
-                    if target_dbs.issubset(available_dbs):
-                        for _, row in group.iterrows():
-                            if (
-                                row["DB"] in target_dbs and row[time_col] > 0
-                            ):  # Exclude zero/negative values
-                                all_data.append(
-                                    {
-                                        "DB": row["DB"],
-                                        "rows": rows,
-                                        "query": query,
-                                        "time": row[time_col],
-                                        "file": csv_file,
-                                    }
-                                )
+                in_target = df["DB"].isin(target_dbs)
+                slices.append(
+                    df.loc[in_target, ["DB", "rows", "query", time_col]].assign(
+                        file=csv_file
+                    )
+                )
 
             except Exception as e:
-                print(f"Error reading {csv_file}: {e}")
+                print(f"Error processing {csv_file}: {e}")
                 continue
 
-        if not all_data:
+        # Filter all files in one pass: keep (file, rows, query) groups where
+        # all three databases are present
+        combined_df = None
+        if slices:
+            pair_cols = ["file", "rows", "query"]
+            target_df = pd.concat(slices, ignore_index=True)
+            has_all = target_df.groupby(pair_cols)["DB"].nunique() == len(target_dbs)
+            valid_pairs = has_all[has_all].index.to_frame(index=False)
+            combined_df = target_df.merge(valid_pairs, on=pair_cols)
+            combined_df = combined_df[
+                combined_df[time_col] > 0  # Exclude zero/negative values
+            ].rename(columns={time_col: "time"})
+
+        if combined_df is None or combined_df.empty:
             print(
                 "No data found where all three databases (Postgres, SQLite, HSQLDB) ran the same queries."
             )
             return
 
-        # Convert to DataFrame
-        combined_df = pd.DataFrame(all_data)
-
         print(
-            f"Found {len(combined_df)} qualifying data points across {len(combined_df.groupby(['query', 'rows']))} query/dataset combinations"
+            f"Found {len(combined_df)} qualifying data points across {combined_df.groupby(['query', 'rows']).ngroups} query/dataset combinations"
         )
 
         # Get unique databases and row counts
         db_order = ["Postgres", "SQLite", "HSQLDB"]
-        available_dbs = [db for db in db_order if db in combined_df["DB"].unique()]
+        all_dbs = set(combined_df["DB"].unique())
+        available_dbs = [db for db in db_order if db in all_dbs]
         rows = sorted(combined_df["rows"].unique())
-
-        # Calculate geometric mean for each database and row count combination
-        geometric_means = {}
-        for db in available_dbs:
-            geometric_means[db] = {}
-            for row_count in rows:
-                db_row_data = combined_df[
-                    (combined_df["DB"] == db) & (combined_df["rows"] == row_count)
-                ]["time"].values
-                if len(db_row_data) > 0:
-                    # Use scipy's geometric mean
-                    geometric_means[db][row_count] = gmean(db_row_data)
-                else:
-                    geometric_means[db][row_count] = 0
+        total_queries = combined_df["query"].nunique()
+
+        # Calculate geometric mean for each database and row count combination,
+        # gm[i, j] holds available_dbs[i] at rows[j] (0 if missing)
+        gm = (
+            combined_df.groupby(["DB", "rows"], observed=True)["time"]
+            .agg(gmean)
+            .unstack("rows")
+            .reindex(index=available_dbs, columns=rows, fill_value=0)
+            .to_numpy(dtype=np.float64, na_value=0.0)
+        )
 
         # Create the plot (same style as other diagrams)
         fig, ax = plt.subplots(figsize=(12, 6))
-        bar_width = 0.35 if len(rows) <= 2 else 0.2
-        x = range(len(available_dbs))
-
-        for i, row_count in enumerate(rows):
-            values = []
-            for db in available_dbs:
-                values.append(geometric_means[db][row_count])
-
-            ax.bar(
-                [pos + i * bar_width for pos in x],
-                values,
-                width=bar_width,
-                label=f"{row_count:,} rows",
-            )
+        plot_grouped_bars(ax, gm, available_dbs, rows, ".1f")
 
         # Formatting (same as other diagrams)
-        ax.set_xticks([pos + (len(rows) - 1) / 2 * bar_width for pos in x])
-        ax.set_xticklabels(available_dbs)
         ax.set_ylabel(f"Geometric Mean {time_col} (ms)")
         ax.set_xlabel("Database")
         ax.set_title(
@@ -223,28 +245,6 @@ def plot_geometric_mean_performance(time_col="Med_ms", save_plots=True):
         ax.legend(title="Dataset Size", bbox_to_anchor=(1.05, 1), loc="upper left")
         ax.grid(True, alpha=0.3)
 
-        # Add value labels on bars
-        for i, row_count in enumerate(rows):
-            values = []
-            for db in available_dbs:
-                values.append(geometric_means[db][row_count])
-
-            max_val = (
-                max([v for v in values if v > 0]) if any(v > 0 for v in values) else 1
-            )
-            for j, v in enumerate(values):
-                if v > 0:
-                    ax.text(
-                        j + i * bar_width,
-                        v + max_val * 0.02,
-                        f"{v:.1f}",
-                        ha="center",
-                        va="bottom",
-                        fontsize=8,
-                        rotation=0,
-                    )
-
-        total_queries = len(combined_df["query"].unique())
         ax.text(
             0.01,
             0.98,
@@ -258,7 +258,7 @@ def plot_geometric_mean_performance(time_col="Med_ms", save_plots=True):
 
         if save_plots:
             output_name = "geometric_mean_performance.png"
-            plt.savefig(output_name, dpi=300, bbox_inches="tight")
+            plt.savefig(output_name, dpi=dpi, bbox_inches="tight")
             print(f"Saved geometric mean plot: {output_name}")
             plt.close(fig)
         else:
@@ -272,10 +272,10 @@ def plot_geometric_mean_performance(time_col="Med_ms", save_plots=True):
         print()
         print("-" * (12 + len(rows) * 17))
 
-        for db in available_dbs:
+        for i, db in enumerate(available_dbs):
             print(f"{db:<12} ", end="")
-            for row_count in rows:
-                mean_val = geometric_means[db][row_count]
+            for j in range(len(rows)):
+                mean_val = gm[i, j]
                 print(f"{mean_val:>17.1f}", end="")
             print()
 
@@ -283,11 +283,43 @@ def plot_geometric_mean_performance(time_col="Med_ms", save_plots=True):
         print(f"Error generating geometric mean plot: {str(e)}")
 
 
-def process_all_csvs(time_col="Med_ms", save_plots=True):
+def _init_plot_worker():
+    """Create the figure a worker process reuses for its files"""
+    global _worker_ax
+    plt.switch_backend("Agg")
+    _, _worker_ax = plt.subplots(figsize=(12, 6))
+
+
+def _plot_in_worker(job):
+    """Save the plot for one CSV in a worker process and return its log output"""
+    csv_file, df, time_col, dpi, output_name = job
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        print(f"\n{'='*50}")
+        print(f"Processing: {csv_file}")
+        print("=" * 50)
+
+        plot_query_performance(
+            csv_file,
+            time_col,
+            True,
+            df=df,
+            ax=_worker_ax,
+            dpi=dpi,
+            output_name=output_name,
+        )
+    return log.getvalue()
+
+
+def process_all_csvs(time_col="Med_ms", save_plots=True, dpi=120):
     """Process all CSV files in the current directory"""
 
     # Find all CSV files in current directory
-    csv_files = glob.glob("*.csv")
+    csv_files = [
+        entry.name
+        for entry in os.scandir(".")
+        if entry.name.endswith(".csv") and entry.is_file()
+    ]
 
     if not csv_files:
         print("No CSV files found in the current directory.")
@@ -297,21 +329,44 @@ def process_all_csvs(time_col="Med_ms", save_plots=True):
     for file in csv_files:
         print(f"  - {file}")
 
-    print(f"\nProcessing individual files... (save_plots={save_plots})")
-
-    # Process each CSV file
+    # Read each CSV once and share the frames between both diagrams
+    dfs = {}
     for csv_file in csv_files:
-        print(f"\n{'='*50}")
-        print(f"Processing: {csv_file}")
-        print("=" * 50)
+        try:
+            dfs[csv_file] = load_csv(csv_file)
+        except Exception as e:
+            print(f"Error reading {csv_file}: {e}")
+
+    print(f"\nProcessing individual files... (save_plots={save_plots})")
 
-        plot_query_performance(csv_file, time_col, save_plots)
+    if save_plots:
+        # Nothing is shown, so render with Agg instead of a GUI backend
+        plt.switch_backend("Agg")
+        plt.ioff()
+
+        # Files are independent, so save them from parallel worker processes.
+        # Logs are printed in file order once each plot is done.
+        jobs = [
+            (csv_file, df, time_col, dpi, performance_png_name(csv_file))
+            for csv_file, df in dfs.items()
+        ]
+        with ProcessPoolExecutor(initializer=_init_plot_worker) as executor:
+            for log in executor.map(_plot_in_worker, jobs):
+                print(log, end="")
+    else:
+        # Showing plots needs the main process, one window per file
+        for csv_file, df in dfs.items():
+            print(f"\n{'='*50}")
+            print(f"Processing: {csv_file}")
+            print("=" * 50)
+
+            plot_query_performance(csv_file, time_col, save_plots, df=df, dpi=dpi)
 
     # Generate geometric mean diagram
     print(f"\n{'='*60}")
     print("Generating Geometric Mean Performance Diagram")
     print("=" * 60)
-    plot_geometric_mean_performance(time_col, save_plots)
+    plot_geometric_mean_performance(dfs, time_col, save_plots, dpi=dpi)
 
 
 # Run for all CSV files in current directory